@@ -0,0 +1,84 @@
+import math
+from typing import List, Tuple
+
+from servo import ServoController, Servo, ServoConfig, PWM_TICKS, peak_overlap
+from sim_hat import SimServoHat
+
+# Same channel set / motion as servo_stress_0_4.py, but against a simulated
+# PCA9685 register map instead of the real hat.
+CHANNELS = [0, 1, 2, 3, 4]
+FRAMES = 200
+UPDATE_HZ = 100.0
+MIN_DEG = 15
+MAX_DEG = 165
+CENTER = (MIN_DEG + MAX_DEG) / 2.0
+AMP = (MAX_DEG - MIN_DEG) / 2.0
+phases = [0.0, 2*math.pi/5, 4*math.pi/5, 6*math.pi/5, 8*math.pi/5]
+omega = 2 * math.pi * 1.5
+
+
+def pulse_widths(hat) -> List[int]:
+    return [hat.width(on, off) for on, off in hat.windows(CHANNELS)]
+
+
+def library_ticks(deg: float, swing: int, hz: int = 50) -> int:
+    # Upstream PiServoHat arithmetic, written out independently of sim_hat:
+    # move_servo_position (min_pt=1 ms, max_pt=2 ms) -> set_duty_cycle
+    ms = 1.0 + deg / swing
+    duty = ms * hz / 10.0
+    return round(duty / 100.0 * PWM_TICKS) - 1
+
+
+def run(stagger: bool) -> Tuple[int, List[List[int]]]:
+    hat = SimServoHat()
+    ctrl = ServoController(pwm_hz=50, hat=hat, stagger=stagger)
+    servos = [Servo(ServoConfig(channel=ch, swing_deg=180)) for ch in CHANNELS]
+    for s in servos:
+        ctrl.register(s)
+    worst = 0
+    widths = []
+    for i in range(FRAMES):
+        t = i / UPDATE_HZ
+        for s, ph in zip(servos, phases):
+            deg = CENTER + AMP * math.sin(omega * t + ph)
+            ctrl.move(s, deg)
+            want = library_ticks(deg, s.cfg.swing_deg)
+            got = pulse_widths(hat)[CHANNELS.index(s.cfg.channel)]
+            assert got == want, f"ch{s.cfg.channel}: width {got} ticks, library gives {want}"
+        w = pulse_widths(hat)
+        widths.append(w)
+        worst = max(worst, peak_overlap(hat.windows(CHANNELS)))
+
+    if stagger:
+        for ch, (on, _) in zip(CHANNELS, hat.windows(CHANNELS)):
+            assert on == ctrl.phase[ch], f"ch{ch}: LED_ON={on}, planned {ctrl.phase[ch]}"
+    return worst, widths
+
+
+aligned, aligned_widths = run(stagger=False)
+staggered, staggered_widths = run(stagger=True)
+print(f"Peak simultaneous pulses on {CHANNELS}: aligned={aligned}  staggered={staggered}")
+
+assert aligned == len(CHANNELS), "without stagger every pulse should rise at tick 0"
+assert staggered == 1, "staggered pulses should never overlap for 5 channels at 50 Hz"
+assert staggered_widths == aligned_widths, "stagger must only shift the phase, not the pulse width"
+
+# Registering channels while others move re-plans their phases. Every
+# intermediate register state (ON and OFF are separate I2C writes) must stay
+# a valid pulse, never wider than the servo's max_us.
+hat = SimServoHat()
+hat.PCA9685.trace = []
+ctrl = ServoController(pwm_hz=50, hat=hat, stagger=True)
+limit = library_ticks(180, 180)
+moving = []
+for i, ch in enumerate(CHANNELS):
+    s = Servo(ServoConfig(channel=ch, swing_deg=180))
+    ctrl.register(s)
+    moving.append(s)
+    for k in range(10):
+        for m in moving:
+            ctrl.move(m, CENTER + AMP * math.sin(omega * (i * 10 + k) / UPDATE_HZ))
+worst = max(hat.width(on, off) for _, on, off in hat.PCA9685.trace)
+print(f"Re-planning {len(hat.PCA9685.trace)} register writes: widest latched pulse {worst} ticks (limit {limit})")
+assert worst <= limit, f"a phase change latched a {worst}-tick pulse"
+print("OK")
@@ -1,12 +1,13 @@
 # robot.py
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import time
 import math
 
-from servo import ServoController, Servo, ServoConfig
+from servo import ServoController, Servo, ServoConfig, tick_coeffs, pulse_ticks
 
 
 @dataclass
@@ -37,48 +38,93 @@ class RobotConfig:
     # Keep away from mechanical endpoints
     margin_deg: float = 5.0
 
+    # Full joint table. If None, the 4-joint table is built from the fields above.
+    joints: Optional[List[ServoConfig]] = None
+
+    def joint_table(self) -> List[ServoConfig]:
+        if self.joints is not None:
+            return list(self.joints)
+        return [
+            ServoConfig(channel=self.base_ch, name="base",
+                        swing_deg=self.base_swing, invert=self.base_invert,
+                        home_deg=self.base_home, margin_deg=self.margin_deg),
+            ServoConfig(channel=self.left_arm_ch, name="left_arm",
+                        swing_deg=self.arm_swing, invert=self.left_arm_invert,
+                        home_deg=self.left_arm_home, margin_deg=self.margin_deg),
+            ServoConfig(channel=self.right_arm_ch, name="right_arm",
+                        swing_deg=self.arm_swing, invert=self.right_arm_invert,
+                        home_deg=self.right_arm_home, margin_deg=self.margin_deg),
+            ServoConfig(channel=self.head_yaw_ch, name="head_yaw",
+                        swing_deg=self.head_yaw_swing, invert=self.head_yaw_invert,
+                        home_deg=self.head_yaw_home, margin_deg=self.margin_deg),
+        ]
+
 
 class Robot:
     """
-    Robot composed of 4 servos:
+    Robot composed of N servos defined by cfg.joint_table().
+    The default table is:
       - base (yaw)
       - left arm
       - right arm
       - head_yaw (horizontal swivel)
-    Uses your ServoController.move / move_many API.
+
+    Joint state lives in flat arrays indexed by joint number (limits, homes,
+    last commanded angle, precomputed degree->tick coefficients), so a full
+    pose update is one pass over the arrays and one ctrl.write_ticks() call.
+    Each joint's Servo is still registered with the controller and reachable
+    as an attribute (robot.base, robot.head_yaw, ...).
     """
     def __init__(self, ctrl: ServoController, cfg: RobotConfig = RobotConfig()):
         self.ctrl = ctrl
         self.cfg = cfg
 
-        self.base = Servo(ServoConfig(
-            channel=cfg.base_ch, name="base",
-            swing_deg=cfg.base_swing, invert=cfg.base_invert,
-            home_deg=cfg.base_home, margin_deg=cfg.margin_deg
-        ))
-        self.left_arm = Servo(ServoConfig(
-            channel=cfg.left_arm_ch, name="left_arm",
-            swing_deg=cfg.arm_swing, invert=cfg.left_arm_invert,
-            home_deg=cfg.left_arm_home, margin_deg=cfg.margin_deg
-        ))
-        self.right_arm = Servo(ServoConfig(
-            channel=cfg.right_arm_ch, name="right_arm",
-            swing_deg=cfg.arm_swing, invert=cfg.right_arm_invert,
-            home_deg=cfg.right_arm_home, margin_deg=cfg.margin_deg
-        ))
-        self.head_yaw = Servo(ServoConfig(
-            channel=cfg.head_yaw_ch, name="head_yaw",
-            swing_deg=cfg.head_yaw_swing, invert=cfg.head_yaw_invert,
-            home_deg=cfg.head_yaw_home, margin_deg=cfg.margin_deg
-        ))
-
-        for s in (self.base, self.left_arm, self.right_arm, self.head_yaw):
+        joints = cfg.joint_table()
+        self.n = len(joints)
+        self.names: List[str] = [j.name for j in joints]
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.servos: List[Servo] = [Servo(j) for j in joints]
+
+        self.channels = array("B", (j.channel for j in joints))
+        self.lo = array("d", (j.margin_deg for j in joints))
+        self.hi = array("d", (float(j.swing_deg) - j.margin_deg for j in joints))
+        self.invert = array("B", (1 if j.invert else 0 for j in joints))
+        self.home_deg = array("d", (float(j.home_deg) for j in joints))
+        self.last = array("d", (math.nan for _ in joints))
+
+        # Fold invert into the tick map: ticks = tick0 + tick_slope * clamped_deg
+        self.tick0 = array("d")
+        self.tick_slope = array("d")
+        for j in joints:
+            off, slope = tick_coeffs(j, ctrl.pwm_hz)
+            if j.invert:
+                off, slope = off + slope * float(j.swing_deg), -slope
+            self.tick0.append(off)
+            self.tick_slope.append(slope)
+
+        # Per-frame scratch buffers (reused, never reallocated)
+        self.target = array("d", self.home_deg)
+        self.mask = bytearray(self.n)
+        self._ticks = array("H", bytes(2 * self.n))
+
+        # Check every name before registering anything, so a bad table leaves
+        # the controller untouched
+        named = [s for s in self.servos if s.cfg.name]
+        seen = set()
+        for s in named:
+            if s.cfg.name in seen or hasattr(self, s.cfg.name):
+                raise ValueError(f"Joint name {s.cfg.name!r} clashes with a Robot attribute or another joint")
+            seen.add(s.cfg.name)
+
+        for s in named:
+            setattr(self, s.cfg.name, s)
+        for s in self.servos:
             self.ctrl.register(s)
 
     # ---------- internal helpers ----------
     def _safe_deg(self, servo: Servo, deg: float) -> float:
         """
-        Apply margin + optional invert. (Since your controller doesn't use these yet.)
+        Apply margin + optional invert for a single servo (the physical angle).
         """
         d = float(deg)
 
@@ -93,42 +139,80 @@ class Robot:
 
         return d
 
+    def write_frame(self, all_joints: bool = True) -> None:
+        """
+        Clamp self.target, convert to ticks and write in one pass.
+        With all_joints=False only joints whose self.mask entry is set are
+        written (and the mask is cleared afterwards).
+        """
+        tgt, lo, hi = self.target, self.lo, self.hi
+        t0, ts, last, ticks = self.tick0, self.tick_slope, self.last, self._ticks
+        inv, servos = self.invert, self.servos
+        mask = None if all_joints else self.mask
+
+        for i in range(self.n):
+            if mask is not None and not mask[i]:
+                continue
+            d = tgt[i]
+            if d < lo[i]:
+                d = lo[i]
+            elif d > hi[i]:
+                d = hi[i]
+            last[i] = d
+            ticks[i] = pulse_ticks(t0[i] + ts[i] * d)
+            # Keep Servo.last_deg in ServoController.move()'s (physical) units
+            s = servos[i]
+            s.last_deg = float(s.cfg.swing_deg) - d if inv[i] else d
+
+        self.ctrl.write_ticks(self.channels, ticks, mask)
+        if mask is not None:
+            for i in range(self.n):
+                mask[i] = 0
+
+    def _require(self, gesture: str, *joints: str) -> None:
+        missing = [j for j in joints if j not in self.index]
+        if missing:
+            raise ValueError(f"{gesture}() needs joints {missing}; this robot has {self.names}")
+
+    def last_deg(self, joint: str) -> Optional[float]:
+        """
+        Last commanded (clamped, pre-invert) angle of a joint, or None.
+        The joint's Servo.last_deg holds the same command after invert.
+        """
+        d = self.last[self.index[joint]]
+        return None if math.isnan(d) else d
+
     # ---------- basic joint controls ----------
     def move_joint(self, joint: str, deg: float) -> float:
-        servo = getattr(self, joint)
-        return self.ctrl.move(servo, self._safe_deg(servo, deg))
-
-    def set_pose(
-        self,
-        *,
-        base: Optional[float] = None,
-        left_arm: Optional[float] = None,
-        right_arm: Optional[float] = None,
-        head_yaw: Optional[float] = None,
-    ) -> None:
+        i = self.index[joint]
+        self.target[i] = float(deg)
+        self.mask[i] = 1
+        self.write_frame(all_joints=False)
+        return self._safe_deg(self.servos[i], deg)
+
+    def set_pose(self, **angles: Optional[float]) -> None:
         """
-        Move any subset of joints "simultaneously" via ctrl.move_many().
+        Move any subset of joints "simultaneously", e.g. set_pose(base=80, head_yaw=100).
         """
-        cmds: Dict[Servo, float] = {}
-        if base is not None:
-            cmds[self.base] = self._safe_deg(self.base, base)
-        if left_arm is not None:
-            cmds[self.left_arm] = self._safe_deg(self.left_arm, left_arm)
-        if right_arm is not None:
-            cmds[self.right_arm] = self._safe_deg(self.right_arm, right_arm)
-        if head_yaw is not None:
-            cmds[self.head_yaw] = self._safe_deg(self.head_yaw, head_yaw)
-
-        if cmds:
-            self.ctrl.move_many(cmds)
+        for name in angles:
+            if name not in self.index:
+                raise ValueError(f"Unknown joint {name!r}, expected one of {self.names}")
+
+        any_set = False
+        for name, deg in angles.items():
+            if deg is None:
+                continue
+            i = self.index[name]
+            self.target[i] = float(deg)
+            self.mask[i] = 1
+            any_set = True
+
+        if any_set:
+            self.write_frame(all_joints=False)
 
     def home(self) -> None:
-        self.set_pose(
-            base=self.base.cfg.home_deg,
-            left_arm=self.left_arm.cfg.home_deg,
-            right_arm=self.right_arm.cfg.home_deg,
-            head_yaw=self.head_yaw.cfg.home_deg
-        )
+        self.target[:] = self.home_deg
+        self.write_frame()
 
     def sleep(self) -> None:
         self.ctrl.sleep()
@@ -136,9 +220,12 @@ class Robot:
     # ---------- gestures ----------
     def shake_head(self, times: int = 2, amount_deg: float = 20.0, period_s: float = 0.5) -> None:
         """
-        Head 'no' gesture (yaw left-right).
+        Head 'no' gesture (yaw left-right). Needs a head_yaw joint.
         """
-        center = self.head_yaw.last_deg if self.head_yaw.last_deg is not None else self.head_yaw.cfg.home_deg
+        self._require("shake_head", "head_yaw")
+        center = self.last_deg("head_yaw")
+        if center is None:
+            center = self.home_deg[self.index["head_yaw"]]
         for _ in range(times):
             self.set_pose(head_yaw=center + amount_deg)
             time.sleep(period_s / 2)
@@ -148,31 +235,35 @@ class Robot:
 
     def wave(self, which: str = "right", times: int = 3, amount_deg: float = 25.0, period_s: float = 0.5) -> None:
         """
-        Simple arm wave by oscillating one arm about its home.
+        Simple arm wave by oscillating one arm about its home. Needs right_arm / left_arm.
         """
-        arm = self.right_arm if which.lower().startswith("r") else self.left_arm
-        center = arm.cfg.home_deg
+        arm = "right_arm" if which.lower().startswith("r") else "left_arm"
+        self._require("wave", arm)
+        center = self.home_deg[self.index[arm]]
         for _ in range(times):
-            self.ctrl.move(arm, self._safe_deg(arm, center + amount_deg))
+            self.move_joint(arm, center + amount_deg)
             time.sleep(period_s / 2)
-            self.ctrl.move(arm, self._safe_deg(arm, center - amount_deg))
+            self.move_joint(arm, center - amount_deg)
             time.sleep(period_s / 2)
-        self.ctrl.move(arm, self._safe_deg(arm, center))
+        self.move_joint(arm, center)
 
     def scan_base(self, duration_s: float = 3.0, speed_hz: float = 0.6, amplitude_deg: float = 35.0) -> None:
         """
-        Rotate base left-right while keeping arms/head at home.
+        Rotate base left-right while keeping arms/head at home. Needs a base joint.
         """
+        self._require("scan_base", "base")
         self.home()
         time.sleep(0.2)
 
-        center = self.base.cfg.home_deg
+        i = self.index["base"]
+        center = self.home_deg[i]
         t0 = time.perf_counter()
 
         while (time.perf_counter() - t0) < duration_s:
             t = time.perf_counter() - t0
-            base_angle = center + amplitude_deg * math.sin(2 * math.pi * speed_hz * t)
-            self.set_pose(base=base_angle)
+            self.target[i] = center + amplitude_deg * math.sin(2 * math.pi * speed_hz * t)
+            self.mask[i] = 1
+            self.write_frame(all_joints=False)
             time.sleep(0.01)
 
     def celebrate(
@@ -191,7 +282,9 @@ class Robot:
         - base sways left/right
         - head yaws left/right
         - both arms go up/down TOGETHER (same commanded angle)
+        Needs base, head_yaw, right_arm and left_arm joints.
         """
+        self._require("celebrate", "base", "head_yaw", "right_arm", "left_arm")
 
         # Start from home pose
         self.home()
@@ -201,9 +294,16 @@ class Robot:
         t0 = time.perf_counter()
         next_t = t0
 
-        base_center = self.base.cfg.home_deg
-        head_center = self.head_yaw.cfg.home_deg
-        arms_center = self.right_arm.cfg.home_deg  # both arms use same center
+        ib = self.index["base"]
+        ih = self.index["head_yaw"]
+        ir = self.index["right_arm"]
+        il = self.index["left_arm"]
+        base_center = self.home_deg[ib]
+        head_center = self.home_deg[ih]
+        arms_center = self.home_deg[ir]  # both arms use same center
+
+        tgt = self.target
+        tgt[:] = self.home_deg  # any extra joints hold home
 
         while True:
             now = time.perf_counter()
@@ -211,20 +311,16 @@ class Robot:
             if t >= duration_s:
                 break
 
-            base_angle = base_center + base_amp * math.sin(2 * math.pi * base_hz * t)
-            head_angle = head_center + head_amp * math.sin(2 * math.pi * head_hz * t + math.pi / 6.0)
+            tgt[ib] = base_center + base_amp * math.sin(2 * math.pi * base_hz * t)
+            tgt[ih] = head_center + head_amp * math.sin(2 * math.pi * head_hz * t + math.pi / 6.0)
 
             # Arms move together (in-phase)
             arms_angle = arms_center + arms_amp * math.sin(2 * math.pi * arms_hz * t)
+            tgt[ir] = arms_angle
+            tgt[il] = arms_angle
 
-            # Apply safety/inversion helper (so you don’t hit endpoints)
-            cmds = {
-                self.base: self._safe_deg(self.base, base_angle),
-                self.head_yaw: self._safe_deg(self.head_yaw, head_angle),
-                self.right_arm: self._safe_deg(self.right_arm, arms_angle),
-                self.left_arm: self._safe_deg(self.left_arm, arms_angle),
-            }
-            self.ctrl.move_many(cmds)
+            # Clamp/invert/tick conversion for all joints in one pass
+            self.write_frame()
 
             # rate control
             next_t += dt
@@ -236,8 +332,3 @@ class Robot:
 
         # Return to home at the end
         self.home()
-
-
-
-
-
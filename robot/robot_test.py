@@ -0,0 +1,94 @@
+import math
+
+from robot import Robot, RobotConfig
+from servo import ServoController
+from sim_hat import SimServoHat
+
+# Checks the array-backed Robot against the original per-joint path
+# (_safe_deg + PiServoHat.move_servo_position) on simulated register maps.
+
+cfg = RobotConfig(
+    base_ch=0, left_arm_ch=2, right_arm_ch=1, head_yaw_ch=3,
+    base_swing=90,                       # mixed swings
+    left_arm_invert=True, head_yaw_invert=True,
+    base_home=45, head_yaw_home=100,
+    margin_deg=5.0,
+)
+
+hat = SimServoHat()
+robot = Robot(ServoController(pwm_hz=50, hat=hat), cfg)
+
+# Reference: the baseline Robot, one joint at a time
+ref = SimServoHat()
+ref_last = {}
+
+
+def safe_deg(j, deg: float) -> float:
+    d = max(j.margin_deg, min(float(j.swing_deg) - j.margin_deg, float(deg)))
+    if j.invert:
+        d = float(j.swing_deg) - d
+    return d
+
+
+def ref_pose(**angles) -> None:
+    for name, deg in angles.items():
+        if deg is None:
+            continue
+        j = robot.servos[robot.index[name]].cfg
+        d = safe_deg(j, deg)
+        ref.move_servo_position(j.channel, d, swing=j.swing_deg)
+        ref_last[name] = d
+
+
+def check(label: str) -> None:
+    assert hat.PCA9685.regs == ref.PCA9685.regs, (
+        label, hat.windows(list(robot.channels)), ref.windows(list(robot.channels)))
+    for name in robot.names:
+        s = getattr(robot, name)
+        assert s.last_deg == ref_last.get(name), (label, name, s.last_deg, ref_last.get(name))
+        logical = robot.last_deg(name)
+        if name in ref_last:
+            j = s.cfg
+            expect = j.swing_deg - ref_last[name] if j.invert else ref_last[name]
+            assert math.isclose(logical, expect), (label, name, logical, expect)
+        else:
+            assert logical is None, (label, name, logical)
+
+
+# home
+robot.home()
+ref_pose(**{n: robot.servos[i].cfg.home_deg for n, i in robot.index.items()})
+check("home")
+
+# set_pose: subsets, None kwargs, clamping at both ends, inverted joints
+poses = [
+    dict(base=30.0),
+    dict(head_yaw=10.0, left_arm=None),
+    dict(base=-20.0, left_arm=200.0, right_arm=0.0, head_yaw=179.0),
+    dict(base=95.0, left_arm=3.0, right_arm=181.5),
+    dict(left_arm=None, right_arm=None),
+    dict(base=22.5, left_arm=47.3, right_arm=133.7, head_yaw=91.25),
+]
+for i, pose in enumerate(poses):
+    robot.set_pose(**pose)
+    ref_pose(**pose)
+    check(f"set_pose #{i} {pose}")
+
+# move_joint returns the physical (post-invert) angle, like the old ctrl.move()
+for name, deg in (("left_arm", 60.0), ("head_yaw", -5.0), ("base", 88.0), ("right_arm", 175.0)):
+    got = robot.move_joint(name, deg)
+    ref_pose(**{name: deg})
+    assert got == ref_last[name], (name, got, ref_last[name])
+    check(f"move_joint {name}={deg}")
+
+# A full sweep, every joint, every frame
+for k in range(200):
+    deg = -10.0 + k * 1.0
+    pose = {name: deg for name in robot.names}
+    for name, i in robot.index.items():
+        robot.target[i] = deg
+    robot.write_frame()
+    ref_pose(**pose)
+    check(f"sweep {deg}")
+
+print("OK")
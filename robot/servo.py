@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, Dict, Optional, List
+from typing import Iterable, Dict, Optional, List, Sequence, Tuple
 import time
 import math
+from array import array
 
 from pi_servo_hat import PiServoHat
 
@@ -17,6 +18,70 @@ class ServoConfig:
     invert: bool = False         # flip direction if mounted reversed
     home_deg: float = 0
     margin_deg: float = 5.0
+    # Pulse width at 0 deg / at swing_deg. Defaults match PiServoHat's 1-2 ms
+    # move_servo_position map; widen per joint only with values found by calibrate_us.py.
+    min_us: float = 1000.0
+    max_us: float = 2000.0
+
+
+PWM_TICKS = 4096                 # PCA9685 is 12-bit: one period = 4096 ticks
+FULL_OFF = 0x1000                # LED_OFF bit 12: output held low regardless of LED_ON
+
+
+def tick_coeffs(cfg: ServoConfig, pwm_hz: float) -> Tuple[float, float]:
+    """
+    Linear map from servo degrees to PCA9685 ticks: x = offset + slope * deg.
+    Turn x into a pulse width with pulse_ticks().
+    """
+    ticks_per_us = PWM_TICKS * float(pwm_hz) / 1_000_000.0
+    us_per_deg = (cfg.max_us - cfg.min_us) / float(cfg.swing_deg)
+    return cfg.min_us * ticks_per_us, us_per_deg * ticks_per_us
+
+
+def pulse_ticks(x: float) -> int:
+    """
+    Pulse width in ticks, rounded the way PiServoHat.set_duty_cycle does
+    (round(duty / 100 * 4096) - 1), so the default path programs the same
+    registers as move_servo_position().
+    """
+    return max(0, round(x) - 1)
+
+
+def plan_phase_offsets(channels: Iterable[int]) -> Dict[int, int]:
+    """
+    Pick an LED_ON tick for each channel so pulses start staggered across the
+    PWM period instead of all rising at tick 0. Channels are spread evenly
+    (sorted by channel number), so with n channels and pulses at most w ticks
+    wide the pulses never overlap as long as n * w <= PWM_TICKS, and otherwise
+    at most ceil(n * w / PWM_TICKS) are high at once.
+    """
+    chans = sorted(set(channels))
+    if not chans:
+        return {}
+    step = PWM_TICKS // len(chans)
+    return {ch: i * step for i, ch in enumerate(chans)}
+
+
+def peak_overlap(windows: Iterable[Tuple[int, int]]) -> int:
+    """
+    Max number of (on, off) PCA9685 pulses high at the same tick (handles wrap-around).
+    """
+    events: List[Tuple[int, int]] = []
+    for on, off in windows:
+        on %= PWM_TICKS
+        off %= PWM_TICKS
+        if on == off:
+            continue
+        if off < on:  # pulse wraps past the end of the period
+            events += [(on, 1), (PWM_TICKS, -1), (0, 1), (off, -1)]
+        else:
+            events += [(on, 1), (off, -1)]
+    events.sort(key=lambda e: (e[0], e[1]))  # falling edges first at the same tick
+    peak = cur = 0
+    for _, step in events:
+        cur += step
+        peak = max(peak, cur)
+    return peak
 
 class Servo:
     """
@@ -31,26 +96,48 @@ class ServoController:
     """
     Owns the PiServoHat and provides safe movement commands.
     Create one controller, then create multiple Servo objects that use it.
+
+    Pass stagger=True to give every registered channel its own LED_ON offset
+    (see plan_phase_offsets) so pulses don't all rise at tick 0. hat can be
+    any PiServoHat-compatible object (e.g. sim_hat.SimServoHat).
     """
-    def __init__(self, pwm_hz: int = 50, debug: int = 0):
-        self.hat = PiServoHat(debug=debug)
+    def __init__(self, pwm_hz: int = 50, debug: int = 0, hat=None, stagger: bool = False):
+        self.hat = hat if hat is not None else PiServoHat(debug=debug)
         # If your library version has is_connected(), this is a good guard:
         if hasattr(self.hat, "is_connected") and not self.hat.is_connected():
             raise RuntimeError("Pi Servo pHAT not detected on I2C (expected addr 0x40).")
 
         self.hat.restart()
         self.hat.set_pwm_frequency(pwm_hz)
+        self.pwm_hz = pwm_hz
 
         self.servos: Dict[int, Servo] = {}
+        self.stagger = stagger
+        self.phase = array("H", bytes(2 * 16))  # planned LED_ON tick per channel
+        # LED_ON currently in the chip (0xFFFF = unknown, e.g. after restart)
+        self._on_applied = array("H", [0xFFFF] * 16)
 
     def register(self, servo: Servo) -> None:
         ch = servo.cfg.channel
         if not (0 <= ch <= 15):
             raise ValueError(f"Channel must be 0..15, got {ch}")
         self.servos[ch] = servo
+        if self.stagger:
+            self.plan_phases()
+
+    def plan_phases(self) -> Dict[int, int]:
+        """
+        Re-plan LED_ON offsets for the registered channel set.
+        """
+        plan = plan_phase_offsets(self.servos.keys())
+        for ch in range(16):
+            self.phase[ch] = plan.get(ch, 0)
+        return plan
 
     def move(self, servo: Servo, deg: float) -> float:
-        self.hat.move_servo_position(servo.cfg.channel, deg, swing=servo.cfg.swing_deg)
+        # Same degree->tick map as Robot's write_frame(), staggered or not
+        off, slope = tick_coeffs(servo.cfg, self.pwm_hz)
+        self._write_channel(servo.cfg.channel, pulse_ticks(off + slope * deg))
         servo.last_deg = deg
         return deg
 
@@ -63,6 +150,39 @@ class ServoController:
             results[s] = self.move(s, d)
         return results
 
+    def write_ticks(
+        self,
+        channels: Sequence[int],
+        ticks: Sequence[int],
+        mask: Optional[Sequence[int]] = None,
+    ) -> None:
+        """
+        Write precomputed OFF tick counts, one per channel (skip entries where mask is 0).
+        Used by Robot's array-backed pose path; no per-call allocation.
+        """
+        for i in range(len(channels)):
+            if mask is None or mask[i]:
+                self._write_channel(channels[i], ticks[i])
+
+    def _write_channel(self, ch: int, width_ticks: int) -> None:
+        """
+        Program LED_ON/LED_OFF directly: pulse starts at this channel's phase
+        offset (0 unless stagger=True). qwiic_pca9685's set_channel_word takes
+        on_off=1 for LED_ON and 0 for LED_OFF, same order as PiServoHat.set_duty_cycle.
+
+        ON and OFF are separate I2C writes, so a new LED_ON next to the old
+        LED_OFF could emit one wrapped, far-too-long pulse. When the phase
+        changes, the output is held FULL_OFF across the ON update (at worst
+        one skipped pulse); otherwise only LED_OFF is rewritten.
+        """
+        pca = self.hat.PCA9685
+        on = self.phase[ch]
+        if self._on_applied[ch] != on:
+            pca.set_channel_word(ch, 0, FULL_OFF)
+            pca.set_channel_word(ch, 1, on)
+            self._on_applied[ch] = on
+        pca.set_channel_word(ch, 0, (on + width_ticks) % PWM_TICKS)
+
     def home_all(self) -> None:
         for s in self.servos.values():
             self.move(s, s.cfg.home_deg)
@@ -0,0 +1,328 @@
+# servo_bus.py
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, Optional, Sequence
+import math
+import socket
+import struct
+import threading
+import time
+
+from servo import ServoController, Servo, PWM_TICKS
+
+N_CHANNELS = 16
+
+# One command on the wire: channel (0-15), priority (-128..127), OFF ticks
+_CMD = struct.Struct("<BbH")
+DEFAULT_UDP_PORT = 47816
+
+
+class ServoBus:
+    """
+    Single owner of the servo bus. Any number of threads (via port()) or local
+    processes (via serve_udp() + BusClient) post OFF-tick targets per channel;
+    once per frame the bus writes only the latest target for each channel.
+
+    Priorities: a post only replaces the pending target on a channel if its
+    priority is >= the pending one. A post also claims the channel for hold_s
+    seconds (hold_s=None: until release()), and claim() takes channels
+    explicitly until release(). While a claim is active, lower-priority posts
+    are rejected, so e.g. a safety home stays put while a gesture loop keeps
+    running.
+
+    stats()["combined"] counts posts replaced by a later post in the same
+    frame; stats()["rejected"] counts posts refused by a higher priority.
+    """
+    def __init__(self, ctrl: ServoController, frame_hz: float = 50.0, hold_s: Optional[float] = 0.25):
+        self.ctrl = ctrl
+        self.pwm_hz = ctrl.pwm_hz
+        self.frame_s = 1.0 / float(frame_hz)
+        self.hold_s = math.inf if hold_s is None else float(hold_s)
+
+        self._lock = threading.Lock()       # guards pending buffers + claims
+        self._bus_lock = threading.Lock()   # guards flush (buffer swap + I2C write)
+
+        # Double-buffered pending frame, indexed by channel
+        self._ticks = array("H", bytes(2 * N_CHANNELS))
+        self._prio = array("b", bytes(N_CHANNELS))
+        self._mask = bytearray(N_CHANNELS)
+        self._out_ticks = array("H", bytes(2 * N_CHANNELS))
+        self._out_mask = bytearray(N_CHANNELS)
+        self._channels = array("B", range(N_CHANNELS))
+
+        # Per-channel priority claim (priority, expires_at; inf = until released)
+        self._claim_prio = array("b", bytes(N_CHANNELS))
+        self._claim_until = array("d", bytes(8 * N_CHANNELS))
+
+        self._stats: Dict[str, int] = {"posted": 0, "combined": 0, "rejected": 0, "frames": 0, "writes": 0}
+
+        self._thread: Optional[threading.Thread] = None
+        self._udp_thread: Optional[threading.Thread] = None
+        self._udp_sock: Optional[socket.socket] = None
+        self._running = False
+
+    # ---------- posting ----------
+    @staticmethod
+    def _check(channel: int, ticks: int, priority: int) -> None:
+        if not (0 <= channel < N_CHANNELS):
+            raise ValueError(f"Channel must be 0..{N_CHANNELS - 1}, got {channel}")
+        if not (0 <= ticks < PWM_TICKS):
+            raise ValueError(f"Ticks must be 0..{PWM_TICKS - 1}, got {ticks}")
+        if not (-128 <= priority <= 127):
+            raise ValueError(f"Priority must be -128..127, got {priority}")
+
+    def _post_locked(self, channel: int, ticks: int, priority: int, now: float) -> bool:
+        st = self._stats
+        st["posted"] += 1
+        active = now < self._claim_until[channel]
+        if active and priority < self._claim_prio[channel]:
+            st["rejected"] += 1
+            return False
+        if self._mask[channel]:
+            if priority < self._prio[channel]:
+                st["rejected"] += 1
+                return False
+            st["combined"] += 1  # the pending one is replaced
+        self._ticks[channel] = ticks
+        self._prio[channel] = priority
+        self._mask[channel] = 1
+        # Take or extend the claim; never shorten one (e.g. an explicit claim())
+        until = now + self.hold_s
+        if not active or priority > self._claim_prio[channel]:
+            self._claim_prio[channel] = priority
+            self._claim_until[channel] = until
+        elif until > self._claim_until[channel]:
+            self._claim_until[channel] = until
+        return True
+
+    def post(self, channel: int, ticks: int, priority: int = 0) -> bool:
+        """
+        Queue an OFF-tick target for this frame. Returns False if it was
+        rejected by a higher priority on the channel.
+        """
+        self._check(channel, ticks, priority)
+        now = time.perf_counter()
+        with self._lock:
+            return self._post_locked(channel, ticks, priority, now)
+
+    def post_many(
+        self,
+        channels: Sequence[int],
+        ticks: Sequence[int],
+        mask: Optional[Sequence[int]] = None,
+        priority: int = 0,
+    ) -> None:
+        """
+        Queue a whole pose atomically: every entry is validated first, then
+        all are posted under one lock so a flush can't split them across frames.
+        """
+        n = len(channels)
+        for i in range(n):
+            if mask is None or mask[i]:
+                self._check(channels[i], ticks[i], priority)
+        now = time.perf_counter()
+        with self._lock:
+            for i in range(n):
+                if mask is None or mask[i]:
+                    self._post_locked(channels[i], ticks[i], priority, now)
+
+    def claim(self, channels: Iterable[int], priority: int) -> None:
+        """
+        Hold channels at this priority until release(): lower-priority posts
+        are rejected. E.g. a KO handler claims the robot, homes it, then releases.
+        """
+        chans = list(channels)
+        for ch in chans:
+            self._check(ch, 0, priority)
+        with self._lock:
+            for ch in chans:
+                self._claim_prio[ch] = priority
+                self._claim_until[ch] = math.inf
+
+    def release(self, channels: Iterable[int], priority: Optional[int] = None) -> None:
+        """
+        Drop the claim on channels (only where it is held at `priority`, if given).
+        """
+        chans = list(channels)
+        for ch in chans:
+            self._check(ch, 0, 0 if priority is None else priority)
+        with self._lock:
+            for ch in chans:
+                if priority is None or self._claim_prio[ch] == priority:
+                    self._claim_prio[ch] = 0
+                    self._claim_until[ch] = 0.0
+
+    def port(self, priority: int = 0) -> "BusPort":
+        """
+        Controller-like handle for one source; pass it to Robot in place of a ServoController.
+        """
+        return BusPort(self, priority)
+
+    # ---------- flushing ----------
+    def flush(self) -> int:
+        """
+        Write the pending frame to the bus. Returns the number of channels written.
+        Safe to call from any thread: _bus_lock covers the swap and the write,
+        so a second flush can't recycle the out buffers mid-write. Posting only
+        needs _lock, so it isn't blocked by the I2C traffic.
+        """
+        with self._bus_lock:
+            with self._lock:
+                self._ticks, self._out_ticks = self._out_ticks, self._ticks
+                self._mask, self._out_mask = self._out_mask, self._mask
+                for ch in range(N_CHANNELS):
+                    self._mask[ch] = 0
+                self._stats["frames"] += 1
+
+            n = sum(self._out_mask)
+            if n:
+                self.ctrl.write_ticks(self._channels, self._out_ticks, self._out_mask)
+                with self._lock:
+                    self._stats["writes"] += n
+            return n
+
+    def _run(self) -> None:
+        next_t = time.perf_counter()
+        while self._running:
+            self.flush()
+            next_t += self.frame_s
+            sleep_dt = next_t - time.perf_counter()
+            if sleep_dt > 0:
+                time.sleep(sleep_dt)
+            else:
+                next_t = time.perf_counter()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="servo-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._udp_sock is not None:
+            sock, self._udp_sock = self._udp_sock, None
+            if self._udp_thread is not None:
+                self._udp_thread.join()
+                self._udp_thread = None
+            sock.close()
+        self.flush()
+
+    def sleep(self) -> None:
+        self.flush()
+        with self._bus_lock:
+            self.ctrl.sleep()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    # ---------- local processes ----------
+    def serve_udp(self, port: int = DEFAULT_UDP_PORT, host: str = "127.0.0.1") -> None:
+        """
+        Accept posts from other local processes (see BusClient). Each datagram
+        is a packed list of (channel, priority, ticks) commands.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, port))
+        sock.settimeout(0.2)  # so stop() can end the loop
+        self._udp_sock = sock
+        self._udp_thread = threading.Thread(target=self._udp_loop, args=(sock,),
+                                            name="servo-bus-udp", daemon=True)
+        self._udp_thread.start()
+
+    def _udp_loop(self, sock: socket.socket) -> None:
+        while self._udp_sock is sock:
+            try:
+                data = sock.recv(_CMD.size * N_CHANNELS * 4)
+            except socket.timeout:
+                continue
+            except OSError:
+                return  # socket closed by stop()
+            cmds = list(_CMD.iter_unpack(data[: len(data) - len(data) % _CMD.size]))
+            # One datagram is one pose: post it atomically, per priority
+            for prio in sorted({c[1] for c in cmds}):
+                chans = [ch for ch, p, _ in cmds if p == prio]
+                ticks = [t for _, p, t in cmds if p == prio]
+                try:
+                    self.post_many(chans, ticks, priority=prio)
+                except ValueError:
+                    pass  # malformed datagram: drop it whole
+
+
+class BusPort:
+    """
+    Per-source view of a ServoBus with the ServoController surface Robot uses
+    (pwm_hz, register, write_ticks, sleep). All writes go through the bus at
+    this port's priority.
+    """
+    def __init__(self, bus: ServoBus, priority: int = 0):
+        self.bus = bus
+        self.priority = priority
+        self.pwm_hz = bus.pwm_hz
+
+    def register(self, servo: Servo) -> None:
+        with self.bus._bus_lock:
+            self.bus.ctrl.register(servo)
+
+    def write_ticks(
+        self,
+        channels: Sequence[int],
+        ticks: Sequence[int],
+        mask: Optional[Sequence[int]] = None,
+    ) -> None:
+        self.bus.post_many(channels, ticks, mask, self.priority)
+
+    def claim(self, channels: Iterable[int]) -> None:
+        self.bus.claim(channels, self.priority)
+
+    def release(self, channels: Iterable[int]) -> None:
+        self.bus.release(channels, self.priority)
+
+    def sleep(self) -> None:
+        self.bus.sleep()
+
+
+class BusClient:
+    """
+    Posts targets to a ServoBus.serve_udp() listener from another local process.
+    Also usable as Robot's ctrl (sleep() is left to the bus owner).
+    """
+    def __init__(self, priority: int = 0, pwm_hz: int = 50,
+                 port: int = DEFAULT_UDP_PORT, host: str = "127.0.0.1"):
+        self.priority = priority
+        self.pwm_hz = pwm_hz
+        self.addr = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._buf = bytearray(_CMD.size * N_CHANNELS)
+
+    def register(self, servo: Servo) -> None:
+        ch = servo.cfg.channel
+        if not (0 <= ch < N_CHANNELS):
+            raise ValueError(f"Channel must be 0..{N_CHANNELS - 1}, got {ch}")
+
+    def post(self, channel: int, ticks: int, priority: Optional[int] = None) -> None:
+        prio = self.priority if priority is None else priority
+        self.sock.sendto(_CMD.pack(channel, prio, ticks), self.addr)
+
+    def write_ticks(
+        self,
+        channels: Sequence[int],
+        ticks: Sequence[int],
+        mask: Optional[Sequence[int]] = None,
+    ) -> None:
+        n = 0
+        for i in range(len(channels)):
+            if mask is None or mask[i]:
+                _CMD.pack_into(self._buf, n * _CMD.size, channels[i], self.priority, ticks[i])
+                n += 1
+        if n:
+            self.sock.sendto(memoryview(self._buf)[: n * _CMD.size], self.addr)
+
+    def close(self) -> None:
+        self.sock.close()
@@ -0,0 +1,184 @@
+import sys
+import threading
+import time
+from typing import Optional
+
+from robot import Robot
+from servo import ServoController
+import servo_bus
+from servo_bus import ServoBus
+from sim_hat import SimServoHat
+
+# Checks ServoBus write-combining against a simulated PCA9685 register map.
+
+
+def make_bus(hold_s: Optional[float] = 0.25):
+    hat = SimServoHat()
+    return hat, ServoBus(ServoController(pwm_hz=50, hat=hat), hold_s=hold_s)
+
+
+def width(hat, ch: int) -> int:
+    on, off = hat.windows([ch])[0]
+    return (off - on) % 4096
+
+
+def channel_writes(hat) -> int:
+    return hat.PCA9685.pulses_set  # one live LED_OFF write per channel update
+
+
+# Latest target per channel wins within a frame
+hat, bus = make_bus()
+for ticks in (250, 260, 270):
+    bus.post(0, ticks)
+bus.post(1, 300)
+assert bus.flush() == 2
+assert width(hat, 0) == 270 and width(hat, 1) == 300
+st = bus.stats()
+assert st == {"posted": 4, "combined": 2, "rejected": 0, "frames": 1, "writes": 2}, st
+print("latest-wins:", st)
+
+# A high-priority post holds the channel against lower priorities
+hat, bus = make_bus(hold_s=60.0)
+assert bus.post(0, 307, priority=10)          # safety home
+assert not bus.post(0, 250, priority=0)       # gesture, same frame
+bus.flush()
+assert not bus.post(0, 260, priority=0)       # gesture, next frame, still held
+assert bus.post(0, 280, priority=10)          # same priority may update it
+bus.flush()
+assert width(hat, 0) == 280
+st = bus.stats()
+assert st["combined"] == 0 and st["rejected"] == 2 and st["writes"] == 2, st
+print("priority hold:", st)
+
+# hold_s=None: a post holds its channel until release()
+hat, bus = make_bus(hold_s=None)
+assert bus.post(0, 307, priority=10)
+bus.flush()
+time.sleep(0.05)
+assert not bus.post(0, 250, priority=0)
+bus.release([0], priority=10)
+assert bus.post(0, 250, priority=0)
+bus.flush()
+assert width(hat, 0) == 250
+print("hold until release: ok")
+
+# Explicit claim() outlives hold_s and isn't shortened by the owner's own posts
+hat, bus = make_bus(hold_s=0.01)
+bus.claim([0, 1], priority=10)
+assert bus.post(0, 307, priority=10)
+bus.flush()
+time.sleep(0.05)
+assert not bus.post(0, 250, priority=0) and not bus.post(1, 250, priority=0)
+bus.release([0, 1], priority=0)               # wrong owner: no effect
+assert not bus.post(0, 250, priority=0)
+bus.release([0, 1], priority=10)
+assert bus.post(0, 260, priority=0)
+bus.flush()
+assert width(hat, 0) == 260
+print("claim/release: ok")
+
+# KO during celebrate: the safety home must hold for as long as it is claimed
+hat, bus = make_bus()
+gesture = Robot(bus.port(priority=0))
+safety = Robot(bus.port(priority=10))
+bus.start()
+dance = threading.Thread(target=gesture.celebrate, kwargs={"duration_s": 1.2})
+dance.start()
+time.sleep(0.5)                               # mid-celebrate
+safety.ctrl.claim(safety.channels)
+safety.home()
+time.sleep(0.1)
+home = [width(hat, ch) for ch in safety.channels]
+assert home == list(safety._ticks), (home, list(safety._ticks))
+time.sleep(0.5)                               # well past hold_s, celebrate still posting
+assert [width(hat, ch) for ch in safety.channels] == home
+dance.join()                                  # its closing home() is rejected too
+safety.ctrl.release(safety.channels)
+gesture.set_pose(base=20)
+time.sleep(0.1)
+assert width(hat, 0) != home[0]
+bus.stop()
+assert bus.stats()["rejected"] > 0
+print("KO during celebrate:", bus.stats())
+
+# Bad input is rejected before any state changes
+hat, bus = make_bus()
+for args in ((16, 300, 0), (0, 4096, 0), (0, -1, 0), (0, 300, 128), (0, 300, -129)):
+    try:
+        bus.post(*args)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError(f"post{args} should raise")
+assert bus.stats()["posted"] == 0 and bus.flush() == 0
+print("validation: ok")
+
+# Concurrent posters and flushers: every post is either combined away or written once
+hat, bus = make_bus(hold_s=0.0)
+POSTS = 2000
+done = threading.Event()
+sys.setswitchinterval(1e-6)  # force thread switches inside flush()/post()
+
+
+def poster(ch: int) -> None:
+    for i in range(POSTS):
+        bus.post(ch, 200 + i % 200, priority=ch % 3)
+        time.sleep(0)  # yield so flushes land between posts
+
+
+def flusher() -> None:
+    while not done.is_set():
+        bus.flush()
+
+
+posters = [threading.Thread(target=poster, args=(ch,)) for ch in range(8)]
+flushers = [threading.Thread(target=flusher) for _ in range(3)]
+for t in posters + flushers:
+    t.start()
+for t in posters:
+    t.join()
+done.set()
+for t in flushers:
+    t.join()
+bus.flush()
+sys.setswitchinterval(0.005)
+
+st = bus.stats()
+assert st["posted"] == 8 * POSTS, st
+assert st["posted"] - st["combined"] - st["rejected"] == st["writes"] == channel_writes(hat), (st, channel_writes(hat))
+for ch in range(8):
+    assert width(hat, ch) == 200 + (POSTS - 1) % 200, ch
+print("concurrent:", st)
+
+# post_many is one atomic pose: a flush never lands between two of its channels
+split = []
+
+
+class CheckedController(ServoController):
+    def write_ticks(self, channels, ticks, mask=None):
+        super().write_ticks(channels, ticks, mask)
+        if width(self.hat, 1) != width(self.hat, 2):
+            split.append((width(self.hat, 1), width(self.hat, 2)))
+
+
+hat = SimServoHat()
+bus = ServoBus(CheckedController(pwm_hz=50, hat=hat), hold_s=0.0)
+
+
+class FlushingClock:
+    """Fires a bus flush on every clock read: the bus thread at the worst moment."""
+    def perf_counter(self) -> float:
+        bus.flush()
+        return time.perf_counter()
+
+
+servo_bus.time = FlushingClock()
+for i in range(200):
+    v = 200 + i
+    bus.post_many([1, 2], [v, v])
+servo_bus.time = time
+bus.flush()
+assert not split, f"{len(split)} flushes split a pose, e.g. {split[0]}"
+print("atomic post_many:", bus.stats())
+
+print("OK")
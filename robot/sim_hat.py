@@ -0,0 +1,90 @@
+# sim_hat.py
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from servo import PWM_TICKS, FULL_OFF
+
+LED0_ON_L = 0x06  # each channel: ON_L, ON_H, OFF_L, OFF_H
+
+
+class SimPCA9685:
+    """
+    Register map of a PCA9685 (256 bytes). Only the LED channel registers are modeled.
+    """
+    def __init__(self):
+        self.regs = bytearray(256)
+        self.writes = 0
+        self.pulses_set = 0  # LED_OFF writes that program a live pulse
+        # If a list, every write appends (channel, LED_ON, LED_OFF) as latched
+        self.trace: Optional[List[Tuple[int, int, int]]] = None
+
+    # Same convention as qwiic_pca9685: on_off=1 -> LED_ON, on_off=0 -> LED_OFF
+    @staticmethod
+    def _reg(channel: int, on_off: int) -> int:
+        return LED0_ON_L + 4 * channel + (0 if on_off else 2)
+
+    def set_channel_word(self, channel: int, on_off: int, value: int) -> None:
+        reg = self._reg(channel, on_off)
+        self.regs[reg] = value & 0xFF
+        self.regs[reg + 1] = (value >> 8) & 0x1F
+        self.writes += 1
+        if not on_off and not value & FULL_OFF:
+            self.pulses_set += 1
+        if self.trace is not None:
+            self.trace.append((channel, self.get_channel_word(channel, 1),
+                               self.get_channel_word(channel, 0)))
+
+    def get_channel_word(self, channel: int, on_off: int) -> int:
+        reg = self._reg(channel, on_off)
+        return self.regs[reg] | (self.regs[reg + 1] << 8)
+
+
+class SimServoHat:
+    """
+    Stand-in for pi_servo_hat.PiServoHat backed by SimPCA9685, for checking
+    ServoController output off-hardware: ServoController(hat=SimServoHat()).
+    """
+    def __init__(self, debug: int = 0):
+        self.PCA9685 = SimPCA9685()
+        self.frequency = 50
+        self.asleep = False
+
+    def restart(self) -> None:
+        self.PCA9685.regs[:] = bytes(256)
+        self.asleep = False
+
+    def set_pwm_frequency(self, frequency: int) -> None:
+        self.frequency = frequency
+
+    def get_pwm_frequency(self) -> int:
+        return self.frequency
+
+    def set_duty_cycle(self, channel: int, duty_cycle: float) -> None:
+        # Like the real library: pulse starts at tick 0, OFF = round(duty/100*4096) - 1
+        self.PCA9685.set_channel_word(channel, 1, 0)
+        self.PCA9685.set_channel_word(channel, 0, round(duty_cycle / 100.0 * PWM_TICKS) - 1)
+
+    def move_servo_position(self, channel: int, position: float, swing: int = 90) -> None:
+        # Library default map: 1 ms (min_pt) to 2 ms (max_pt) across the swing
+        ms = 1.0 + float(position) / float(swing)
+        self.set_duty_cycle(channel, ms * self.frequency / 10.0)
+
+    def sleep(self) -> None:
+        self.asleep = True
+
+    @staticmethod
+    def width(on: int, off: int) -> int:
+        """
+        High time in ticks for a latched (LED_ON, LED_OFF) pair.
+        """
+        if off & FULL_OFF:
+            return 0
+        return (off - on) % PWM_TICKS
+
+    def windows(self, channels: List[int]) -> List[Tuple[int, int]]:
+        """
+        (LED_ON, LED_OFF) for each channel, as programmed.
+        """
+        return [(self.PCA9685.get_channel_word(ch, 1), self.PCA9685.get_channel_word(ch, 0))
+                for ch in channels]
@@ -2,6 +2,10 @@ import serial
 import serial.tools.list_ports
 import pyautogui
 import time
+from time import perf_counter
+
+import bridge_metrics as metrics
+from bridge_metrics import log
 
 # Automatically find Arduino port
 def find_arduino_port():
@@ -35,19 +39,67 @@ except Exception as e:
     print(f'Failed to connect to Arduino: {e}')
     exit()
 
+metrics.enable_from_env()
+m = metrics.device(ARDUINO_PORT)
+m.connected()
+
+
+def handle_line(raw):
+    try:
+        line = raw.decode('utf-8').strip()
+    except UnicodeDecodeError:
+        log('decode_error', device=ARDUINO_PORT, raw=raw.hex())
+        return
+    if 'Movement detected' in line:
+        pyautogui.press('a')
+        log('action', device=ARDUINO_PORT, action='press', key='a', line=line)
+    else:
+        log('received', device=ARDUINO_PORT, line=line)
+
+
+def timed_handle_line(raw):
+    t0 = perf_counter()
+    try:
+        line = raw.decode('utf-8').strip()
+    except UnicodeDecodeError:
+        m.drop('decode')
+        log('decode_error', device=ARDUINO_PORT, raw=raw.hex())
+        return
+    t1 = perf_counter()
+
+    inject_s = None
+    if 'Movement detected' in line:
+        # Only the pyautogui call counts as injection time
+        t2 = perf_counter()
+        pyautogui.press('a')
+        inject_s = perf_counter() - t2
+        log('action', device=ARDUINO_PORT, action='press', key='a', line=line)
+    else:
+        m.drop('unmatched')
+        log('received', device=ARDUINO_PORT, line=line)
+    m.observe(t1 - t0, inject_s, perf_counter() - t0)
+
+
+# Metrics off: the plain handler, no timing or gauge calls at all
+timed = m is not metrics.NULL
+handle = timed_handle_line if timed else handle_line
+
 print('Ready to receive keypresses...')
 
 while True:
     try:
-        if arduino.in_waiting > 0:
-            line = arduino.readline().decode('utf-8').strip()
-            print(f"Received: {line}")
-            
-            if 'Movement detected' in line:
-                print('Sending key: a')
-                pyautogui.press('a')
+        waiting = arduino.in_waiting
+        if timed:
+            metrics.set_gauge('bridge_queue_depth_bytes', ARDUINO_PORT, waiting)
+        if waiting > 0:
+            handle(arduino.readline())
         
         time.sleep(0.01)
+    except serial.SerialException as e:
+        m.disconnected()
+        print(f'Lost connection to Arduino: {e}')
+        arduino.close()
+        break
     except KeyboardInterrupt:
         print("\nClosing connection...")
         arduino.close()
@@ -1,45 +1,83 @@
 import asyncio
+import time
+from time import perf_counter
 from bleak import BleakScanner, BleakClient
 import pyautogui
 
+import bridge_metrics as metrics
+from bridge_metrics import log
+
 # Nordic UART Service UUIDs
 UART_SERVICE_UUID = "6E400001-B5A3-F393-E0A9-E50E24DCCA9E"
 UART_TX_CHAR_UUID = "6E400003-B5A3-F393-E0A9-E50E24DCCA9E"
 
 TARGET_DEVICES = ["Left Hand", "Right Hand", "Leg"]  # Add your device names
 
+# Sensor message -> (pyautogui function, key, logged action), in match priority order
+MOVEMENTS = {
+    'Movement:PunchL': (pyautogui.press, 'j', None),
+    'Movement:Left_Down': (pyautogui.keyDown, 'A', 'hold'),
+    'Movement:Left_Up': (pyautogui.keyUp, 'A', 'release'),
+    'Movement:PunchR': (pyautogui.press, 'k', 'press'),
+    'Movement:Right_Down': (pyautogui.keyDown, 'D', 'hold'),
+    'Movement:Right_Up': (pyautogui.keyUp, 'D', 'release'),
+    'Movement:StompR': (pyautogui.press, 'L', 'press'),
+    'Movement:KickR': (pyautogui.press, ';', 'press'),
+}
+
+def match_movement(message):
+    "Look up a sensor message in MOVEMENTS (exact match first, then substring), or None"
+    hit = MOVEMENTS.get(message)
+    if hit is None:
+        for pattern, move in MOVEMENTS.items():
+            if pattern in message:
+                return move
+    return hit
+
 def create_notification_handler(device_name):
     "Create a notification handler for each device"
+    m = metrics.device(device_name)
+
     def notification_handler(sender, data):
-        message = data.decode('utf-8').strip()
-        # print(f"[{device_name}] Received: {message}")
-        
-        if 'Movement:PunchL' in message:
-            # print(f'[{device_name}] Sending key: a')
-            # print('Sending key: a')
-            pyautogui.press('j')
-        elif 'Movement:Left_Down' in message:
-            print(f'[{device_name}] Action: Holding')
-            pyautogui.keyDown('A')
-        elif 'Movement:Left_Up' in message:
-            print(f'[{device_name}] Action: Releasing Left Arrow')
-            pyautogui.keyUp('A')
-        elif 'Movement:PunchR' in message:
-            print(f'[{device_name}] Sending key: s')
-            pyautogui.press('k')
-        elif 'Movement:Right_Down' in message:
-            print(f'[{device_name}] Action: Holding Right Arrow')
-            pyautogui.keyDown('D')
-        elif 'Movement:Right_Up' in message:
-            print(f'[{device_name}] Action: Releasing Right Arrow')
-            pyautogui.keyUp('D')
-        elif 'Movement:StompR' in message:
-            print(f'[{device_name}] Action: Stomp')
-            pyautogui.press('L')
-        elif 'Movement:KickR' in message:
-            print(f'[{device_name}] ActionlLLLLLLL;LLLLL Kick')
-            pyautogui.press(';')
-    return notification_handler
+        try:
+            message = data.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            log('decode_error', device=device_name, raw=data.hex())
+            return
+        hit = MOVEMENTS.get(message) or match_movement(message)
+        if hit is not None:
+            inject, key, action = hit
+            inject(key)
+            if action is not None:
+                log('action', device=device_name, action=action, key=key)
+
+    def timed_notification_handler(sender, data):
+        t0 = perf_counter()
+        try:
+            message = data.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            m.drop('decode')
+            log('decode_error', device=device_name, raw=data.hex())
+            return
+        t1 = perf_counter()
+
+        inject_s = None
+        hit = MOVEMENTS.get(message) or match_movement(message)
+        if hit is None:
+            m.drop('unmatched')
+        else:
+            inject, key, action = hit
+            # Only the pyautogui call counts as injection time
+            t2 = perf_counter()
+            inject(key)
+            inject_s = perf_counter() - t2
+            # Logging stays outside the inject timing but inside the callback total
+            if action is not None:
+                log('action', device=device_name, action=action, key=key)
+        m.observe(t1 - t0, inject_s, perf_counter() - t0)
+
+    # Metrics off: the plain handler, no timing calls at all
+    return notification_handler if m is metrics.NULL else timed_notification_handler
 async def connect_to_device(device_address, device_name):
     """Connect to a single device and listen for notifications"""
     try:
@@ -47,21 +85,26 @@ async def connect_to_device(device_address, device_name):
         
         async with BleakClient(device_address) as client:
             print(f"[{device_name}] Connected!")
+            m = metrics.device(device_name)
+            m.connected()
             
             # Subscribe to notifications
             await client.start_notify(UART_TX_CHAR_UUID, create_notification_handler(device_name))
             
             print(f"[{device_name}] Listening for movement data...")
             
-            # Keep connection alive
+            # Keep connection alive (and measure how late the event loop wakes us)
             try:
                 while True:
+                    t = time.perf_counter()
                     await asyncio.sleep(1)
+                    metrics.set_gauge('bridge_loop_lag_seconds', device_name, time.perf_counter() - t - 1)
             except KeyboardInterrupt:
                 print(f"\n[{device_name}] Disconnecting...")
                 await client.stop_notify(UART_TX_CHAR_UUID)
     
     except Exception as e:
+        metrics.device(device_name).disconnected()
         print(f"[{device_name}] Error: {e}")
 
 
@@ -98,4 +141,6 @@ async def main():
         print("\nShutting down all connections...")
 
 # Run the async main function
-asyncio.run(main())
+if __name__ == "__main__":
+    metrics.enable_from_env()
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+import contextlib
+import io
+import sys
+import time
+import types
+
+# Measures what bridge_metrics costs per BLE notification, using ToughLove's
+# real handler. pyautogui and bleak are stubbed so nothing is injected and
+# no BLE stack is needed; ToughLove only runs main() as __main__.
+pyautogui = types.ModuleType("pyautogui")
+pyautogui.press = pyautogui.keyDown = pyautogui.keyUp = lambda key: None
+bleak = types.ModuleType("bleak")
+bleak.BleakScanner = bleak.BleakClient = None
+sys.modules["pyautogui"] = pyautogui
+sys.modules["bleak"] = bleak
+
+import bridge_metrics as metrics  # noqa: E402
+import ToughLove  # noqa: E402
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+# Typical traffic: mostly punches (no log), some holds (rate-limited log), some noise
+MESSAGES = [
+    b"Movement:PunchL\n", b"Movement:PunchL\n", b"Movement:PunchR\n",
+    b"Movement:Left_Down\n", b"Movement:Left_Up\n", b"Idle\n",
+]
+
+
+def original_handler(sender, data, device_name="bench"):
+    # The pre-metrics handler, as shipped (print() per action)
+    message = data.decode('utf-8').strip()
+    if 'Movement:PunchL' in message:
+        pyautogui.press('j')
+    elif 'Movement:Left_Down' in message:
+        print(f'[{device_name}] Action: Holding')
+        pyautogui.keyDown('A')
+    elif 'Movement:Left_Up' in message:
+        print(f'[{device_name}] Action: Releasing Left Arrow')
+        pyautogui.keyUp('A')
+    elif 'Movement:PunchR' in message:
+        print(f'[{device_name}] Sending key: s')
+        pyautogui.press('k')
+    elif 'Movement:Right_Down' in message:
+        print(f'[{device_name}] Action: Holding Right Arrow')
+        pyautogui.keyDown('D')
+    elif 'Movement:Right_Up' in message:
+        print(f'[{device_name}] Action: Releasing Right Arrow')
+        pyautogui.keyUp('D')
+    elif 'Movement:StompR' in message:
+        print(f'[{device_name}] Action: Stomp')
+        pyautogui.press('L')
+    elif 'Movement:KickR' in message:
+        print(f'[{device_name}] Action: Kick')
+        pyautogui.press(';')
+
+
+def silent_handler(sender, data):
+    # The same chain with no output at all: the floor for any handler
+    message = data.decode('utf-8').strip()
+    if 'Movement:PunchL' in message:
+        pyautogui.press('j')
+    elif 'Movement:Left_Down' in message:
+        pyautogui.keyDown('A')
+    elif 'Movement:Left_Up' in message:
+        pyautogui.keyUp('A')
+    elif 'Movement:PunchR' in message:
+        pyautogui.press('k')
+    elif 'Movement:Right_Down' in message:
+        pyautogui.keyDown('D')
+    elif 'Movement:Right_Up' in message:
+        pyautogui.keyUp('D')
+    elif 'Movement:StompR' in message:
+        pyautogui.press('L')
+    elif 'Movement:KickR' in message:
+        pyautogui.press(';')
+
+
+def run(handler, repeat: int = 5) -> float:
+    # Best of `repeat` passes, to keep scheduler noise out of the comparison
+    msgs = MESSAGES * (N // len(MESSAGES))
+    best = float("inf")
+    # Output goes to memory, so print() here is cheaper than on a real console
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            t = time.perf_counter()
+            for data in msgs:
+                handler(None, data)
+            best = min(best, time.perf_counter() - t)
+    return best / len(msgs) * 1e9
+
+
+results = {"silent": run(silent_handler), "original": run(original_handler)}
+metrics.enabled = False
+plain = ToughLove.create_notification_handler("bench")
+assert plain.__name__ == "notification_handler", "metrics off must use the untimed handler"
+results["disabled"] = run(plain)
+metrics.enabled = True  # counters only; no HTTP server needed to time them
+results["enabled"] = run(ToughLove.create_notification_handler("bench"))
+metrics.enabled = False
+
+base = results["original"]
+for label, ns in results.items():
+    print(f"{label:9s} {ns:7.1f} ns/msg  ({ns - base:+.1f} ns, {ns / base:.2f}x vs original)")
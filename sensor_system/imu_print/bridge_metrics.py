@@ -0,0 +1,227 @@
+# bridge_metrics.py
+"""
+Lightweight counters/histograms for the sensor -> keypress bridges
+(ToughLove.py, KeyMovement.py), served in Prometheus text format, plus a
+rate-limited structured log to replace per-event print().
+
+Off by default. Set BRIDGE_METRICS_PORT (e.g. 9108) to enable, then:
+    curl http://127.0.0.1:9108/metrics
+When disabled, device() hands out the shared NULL device; handlers check
+`m is NULL` once and skip all timing.
+
+Run bench_bridge.py to measure the per-notification overhead.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import threading
+import time
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+LOG_PER_S = 5.0  # max lines per second for each log event name
+
+enabled = False
+_devices: Dict[str, "Device"] = {}
+_gauges: Dict[Tuple[str, str], float] = {}
+_server: Optional[ThreadingHTTPServer] = None
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(BUCKETS, v)] += 1
+        self.total += v
+
+
+class Device:
+    """
+    Per-device metrics. Hot-path calls are plain attribute updates (no locks).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.notifications = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.drops: Dict[str, int] = {}
+        self.callback = Histogram()
+        self.decode = Histogram()
+        self.inject = Histogram()
+
+    def observe(self, decode_s: float, inject_s: Optional[float], callback_s: float) -> None:
+        """
+        Record one handled message. inject_s is None when no key was injected.
+        """
+        self.notifications += 1
+        self.decode.observe(decode_s)
+        if inject_s is not None:
+            self.inject.observe(inject_s)
+        self.callback.observe(callback_s)
+
+    def drop(self, reason: str) -> None:
+        self.drops[reason] = self.drops.get(reason, 0) + 1
+
+    def connected(self) -> None:
+        self.connects += 1
+
+    def disconnected(self) -> None:
+        self.disconnects += 1
+
+
+class NullDevice:
+    def observe(self, decode_s: float, inject_s: Optional[float], callback_s: float) -> None:
+        pass
+
+    def drop(self, reason: str) -> None:
+        pass
+
+    def connected(self) -> None:
+        pass
+
+    def disconnected(self) -> None:
+        pass
+
+
+NULL = NullDevice()
+
+
+def device(name: str):
+    """
+    Metrics handle for one device (a shared NullDevice when disabled).
+    """
+    if not enabled:
+        return NULL
+    d = _devices.get(name)
+    if d is None:
+        d = _devices[name] = Device(name)
+    return d
+
+
+def set_gauge(metric: str, device_name: str, value: float) -> None:
+    if enabled:
+        _gauges[(metric, device_name)] = value
+
+
+# ---------- Prometheus text format ----------
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _hist_lines(name: str, dev: str, h: Histogram) -> List[str]:
+    lines = []
+    cum = 0
+    for le, c in zip(BUCKETS, h.counts):
+        cum += c
+        lines.append(f'{name}_bucket{{device="{dev}",le="{le}"}} {cum}')
+    cum += h.counts[-1]
+    lines.append(f'{name}_bucket{{device="{dev}",le="+Inf"}} {cum}')
+    lines.append(f'{name}_sum{{device="{dev}"}} {h.total}')
+    lines.append(f'{name}_count{{device="{dev}"}} {cum}')
+    return lines
+
+
+def render() -> str:
+    out: List[str] = []
+    devs = list(_devices.values())
+
+    def counter(name: str, help_: str, attr: str) -> None:
+        out.append(f"# HELP {name} {help_}")
+        out.append(f"# TYPE {name} counter")
+        for d in devs:
+            out.append(f'{name}{{device="{_esc(d.name)}"}} {getattr(d, attr)}')
+
+    # Message rate: rate(bridge_notifications_total[30s]) on the Prometheus side
+    counter("bridge_notifications_total", "Sensor messages handled.", "notifications")
+    counter("bridge_connects_total", "Successful connections.", "connects")
+    counter("bridge_disconnects_total", "Connections lost or failed.", "disconnects")
+
+    out.append("# HELP bridge_drops_total Messages dropped without injecting a key.")
+    out.append("# TYPE bridge_drops_total counter")
+    for d in devs:
+        for reason, n in list(d.drops.items()):
+            out.append(f'bridge_drops_total{{device="{_esc(d.name)}",reason="{_esc(reason)}"}} {n}')
+
+    for name, help_, attr in (
+        ("bridge_callback_seconds", "Whole message handler duration.", "callback"),
+        ("bridge_decode_seconds", "Bytes -> str decode duration.", "decode"),
+        ("bridge_inject_seconds", "pyautogui key injection duration.", "inject"),
+    ):
+        out.append(f"# HELP {name} {help_}")
+        out.append(f"# TYPE {name} histogram")
+        for d in devs:
+            out += _hist_lines(name, _esc(d.name), getattr(d, attr))
+
+    seen = set()
+    for (metric, dev), value in sorted(_gauges.items()):
+        if metric not in seen:
+            out.append(f"# TYPE {metric} gauge")
+            seen.add(metric)
+        out.append(f'{metric}{{device="{_esc(dev)}"}} {value}')
+
+    return "\n".join(out) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the console
+
+
+def enable(port: int, host: str = "127.0.0.1") -> None:
+    """
+    Turn metrics on and serve /metrics from a daemon thread.
+    """
+    global enabled, _server
+    enabled = True
+    _server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=_server.serve_forever, name="bridge-metrics", daemon=True).start()
+    log("metrics_enabled", url=f"http://{host}:{port}/metrics")
+
+
+def enable_from_env() -> None:
+    port = os.environ.get("BRIDGE_METRICS_PORT")
+    if port:
+        enable(int(port))
+
+
+# ---------- rate-limited structured log ----------
+_log_next: Dict[str, float] = {}
+_log_suppressed: Dict[str, int] = {}
+_monotonic = time.monotonic
+
+
+def log(event: str, **fields) -> None:
+    """
+    Print one JSON line per event, at most LOG_PER_S lines/s per event name.
+    Suppressed lines are counted and reported on the next line that gets through.
+    """
+    now = _monotonic()
+    if now < _log_next.get(event, 0.0):
+        # Hot path for chatty events: two dict ops, nothing formatted
+        _log_suppressed[event] = _log_suppressed.get(event, 0) + 1
+        return
+    _log_next[event] = now + 1.0 / LOG_PER_S
+    rec = {"ts": round(time.time(), 3), "event": event}
+    rec.update(fields)
+    skipped = _log_suppressed.pop(event, 0)
+    if skipped:
+        rec["suppressed"] = skipped
+    print(json.dumps(rec), flush=True)